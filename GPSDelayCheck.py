@@ -5,22 +5,31 @@ import numpy as np
 import os
 import argparse
 from log_parser.DFParser import *
+from log_parser.LogCatalog import LogCatalog
 
-def main(file_list):
+def main(file_list, catalog=None):
     gps_meta = []
 
+    if catalog is not None:
+        # skip logs without GPA data without parsing them
+        with_gpa = set(catalog.logs_containing('GPA'))
+        file_list = [f for f in file_list if os.path.abspath(f) in with_gpa]
+
     for filename in file_list:
         log = DFLog(filename)
 
         # Plan - get first three messages
         # Get max value of GPS1 delta
-        firmware = log.tables["MSG"]["Message"].iloc[0]
-        os = log.tables["MSG"]["Message"].iloc[1]
-        hardware = log.tables["MSG"]["Message"].iloc[2]
+        if catalog is not None:
+            (firmware, os_version, hardware) = catalog.msg_text(filename)[:3]
+        else:
+            firmware = log.tables["MSG"]["Message"].iloc[0]
+            os_version = log.tables["MSG"]["Message"].iloc[1]
+            hardware = log.tables["MSG"]["Message"].iloc[2]
 
         max_delay = log.tables['GPA']['Delta'].max()
 
-        gps_meta.append([firmware, os, hardware, max_delay])
+        gps_meta.append([firmware, os_version, hardware, max_delay])
 
     gps_meta_df = pd.DataFrame(data=gps_meta, columns=["firmware", "os", "hardware", "max_delay"])
     return gps_meta_df
@@ -30,8 +39,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("output", help="The new log file to output into")
     parser.add_argument("input_folder", help="The folder containing log files")
+    parser.add_argument("-c", "--catalog", help="SQLite log catalog to update and use to skip logs without GPA data")
     args = parser.parse_args()
     folder = args.input_folder
     file_list = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".bin")]
-    df = main(file_list)
+    if args.catalog is not None:
+        with LogCatalog(args.catalog) as catalog:
+            catalog.update(folder)
+            df = main(file_list, catalog)
+    else:
+        df = main(file_list)
     df.to_csv(args.output, index=False)
\ No newline at end of file
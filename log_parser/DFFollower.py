@@ -0,0 +1,191 @@
+import time
+import numpy as np
+import pandas as pd
+from log_parser.DFFramer import BinFramer
+from log_parser.DFParser import DFLog, MessageFormat
+from log_parser.GPSTimeHelper import gps_zero_time
+from log_parser.LogIO import read_stream
+from log_parser.SharedTables import SharedTables
+from log_parser.TimingStats import TimingAccumulator
+
+
+class _TableBuffer(object):
+    """Column arrays for one table that grow by doubling, so appending rows
+    costs amortized O(new rows) and the table can be viewed without copying.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.length = 0
+        self._arrays = None
+
+    def append(self, values):
+        count = len(values[self.columns[0]])
+        if self._arrays is None:
+            self._arrays = {name: np.empty(max(count, 1024),
+                                           dtype=object if isinstance(values[name], list) else values[name].dtype)
+                            for name in self.columns}
+        capacity = len(self._arrays[self.columns[0]])
+        if self.length + count > capacity:
+            capacity = max(2 * capacity, self.length + count)
+            for name, array in self._arrays.items():
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:self.length] = array[:self.length]
+                self._arrays[name] = grown
+        for name in self.columns:
+            column = values[name]
+            if isinstance(column, list):
+                # array valued fields are stored as one object per row
+                packed = np.empty(count, dtype=object)
+                packed[:] = column
+                column = packed
+            self._arrays[name][self.length:self.length + count] = column
+        self.length += count
+
+    def frame(self, start=0):
+        """Returns the rows from start onwards as a DataFrame sharing the column arrays"""
+        # the dtype is given so that pandas keeps object columns as they are,
+        # rather than converting them to its string type on every call
+        return pd.DataFrame({name: pd.Series(array[start:self.length], dtype=array.dtype, copy=False)
+                             for name, array in self._arrays.items()},
+                            columns=self.columns, copy=False)
+
+
+class DFLogFollower(DFLog):
+    """A binary log that is still being written.
+
+    Each poll parses only the bytes appended since the previous one and
+    appends the new rows to `tables`. The last message in the file is held
+    back until the next one starts, as it may still be partially written;
+    poll(final=True) reads it once the log is complete.
+    """
+
+    def __init__(self, filename, poll_interval=0.5, keep_tables=True):
+        """
+        Args:
+            filename (str): The location of the uncompressed binary log
+            poll_interval (float, optional): Seconds to wait between polls when
+                following the log. Defaults to 0.5.
+            keep_tables (bool, optional): Append new rows to `tables`. If False,
+                new rows are only returned and counted in the timing
+                statistics. Defaults to True.
+        """
+        self.filename = filename
+        self.poll_interval = poll_interval
+        self.keep_tables = keep_tables
+        self.timing = TimingAccumulator()
+        self.tables = SharedTables()
+        self.gps_zero_time = None
+        self._data = {}
+        self._formats = {}
+        self._droppable_tables = []
+        self._framer = BinFramer()
+        self._buffers = {}
+        # file offset of the first byte not yet read, and the bytes read but
+        # not yet framed because they hold a partial message
+        self._offset = 0
+        self._pending = bytearray()
+
+    def poll(self, final=False):
+        """Parses any data appended to the log since the last poll
+
+        Args:
+            final (bool, optional): Whether the log has stopped being written, so
+                the last message is complete and is read too. Defaults to False.
+
+        Returns:
+            dict<str, pd.DataFrame>: The new rows keyed on table name
+        """
+        with open(self.filename, 'rb') as infile:
+            infile.seek(self._offset)
+            new_data = read_stream(infile)
+        if len(new_data) == 0 and (not final or len(self._pending) == 0):
+            return {}
+        self._offset += len(new_data)
+        self._pending += new_data
+
+        buf = memoryview(self._pending)
+        offsets, remainder = self._framer.frame(buf, final=final)
+        for type_id, fmt in self._framer.formats.items():
+            if type_id not in self._formats:
+                self._formats[type_id] = MessageFormat(*fmt)
+
+        raw = np.frombuffer(buf, dtype=np.uint8)
+        new_rows = {}
+        new_tables = False
+        for type_id, starts in offsets.items():
+            fmt = self._formats[type_id]
+            if fmt.size != fmt.length - 2:
+                continue
+            columns = fmt.unpack_columns(fmt.unpack_records(raw, starts))
+            if 'TimeUS' in columns:
+                self.timing.update(fmt.name, columns['TimeUS'])
+            if not self.keep_tables and fmt.name != 'FMT':
+                new_rows[fmt.name] = pd.DataFrame(columns, columns=fmt.columns)
+                continue
+            if fmt.name not in self._buffers:
+                self._buffers[fmt.name] = _TableBuffer(fmt.columns)
+                new_tables = True
+            table = self._buffers[fmt.name]
+            first_row = table.length
+            table.append(columns)
+            self.tables[fmt.name] = table.frame()
+            new_rows[fmt.name] = table.frame(first_row)
+        # release the views before the framed bytes are dropped from the buffer
+        del raw
+        buf.release()
+        del self._pending[:remainder]
+
+        if new_tables or 'FMT' in new_rows:
+            self._update_formats_table()
+        if self.gps_zero_time is None and 'GPS' in new_rows:
+            gps = new_rows['GPS'].iloc[0]
+            self.gps_zero_time = gps_zero_time(int(gps['GWk']), int(gps['GMS']), int(gps['TimeUS']))
+        return new_rows
+
+    def _update_formats_table(self):
+        self.tables['FMT'] = self._buffers['FMT'].frame().set_index('Type')
+        if self.keep_tables:
+            self._drop_empty_format_msgs()
+
+    def timing_stats(self):
+        """Returns the timing statistics of every message read so far, see
+        DFLog.timing_stats. Available even when tables are not kept.
+        """
+        return self.timing.stats()
+
+    def follow(self, timeout=None):
+        """Yields new rows as they are appended to the log
+
+        Args:
+            timeout (float, optional): Stop after this many seconds without new
+                data, taking the log as complete and yielding its last message.
+                Defaults to None, following forever.
+
+        Yields:
+            (str, pd.DataFrame): The table name and its new rows
+        """
+        last_data = time.monotonic()
+        while True:
+            new_rows = self.poll()
+            for name, rows in new_rows.items():
+                yield name, rows
+            if len(new_rows) > 0:
+                last_data = time.monotonic()
+            elif timeout is not None and time.monotonic() - last_data >= timeout:
+                for name, rows in self.poll(final=True).items():
+                    yield name, rows
+                return
+            else:
+                time.sleep(self.poll_interval)
+
+    def watch(self, callback, timeout=None):
+        """Calls callback(name, rows) with new rows as they are appended to the log
+
+        Args:
+            callback (function): Called with the table name and a DataFrame of its new rows
+            timeout (float, optional): Stop after this many seconds without new
+                data, taking the log as complete. Defaults to None, following forever.
+        """
+        for name, rows in self.follow(timeout):
+            callback(name, rows)
@@ -0,0 +1,273 @@
+import itertools
+import re
+import struct
+
+
+FMT_TYPE = 128
+
+_MARKER = re.compile(b'\xA3\x95')
+_FMT_STRUCT = struct.Struct("BBB4s16s64s")
+
+
+class MessageFormat(object):
+    _field_formats = {
+        'a': str,
+        'b': int,
+        'B': int,
+        'h': int,
+        'H': int,
+        'i': int,
+        'I': int,
+        'f': float,
+        'd': float,
+        'n': str,
+        'N': str,
+        'Z': str,
+        'c': float,
+        'C': float,
+        'e': float,
+        'E': float,
+        'L': float,
+        'M': str,
+        'q': int,
+        'Q': int
+    }
+
+    _unpack_formats = {
+        'a': '32h',
+        'b': 'b',
+        'B': 'B',
+        'h': 'h',
+        'H': 'H',
+        'i': 'i',
+        'I': 'I',
+        'f': 'f',
+        'd': 'd',
+        'n': '4s',
+        'N': '16s',
+        'Z': '64s',
+        'c': 'h',
+        'C': 'H',
+        'e': 'i',
+        'E': 'I',
+        'L': 'i',
+        'M': 'B',
+        'q': 'q',
+        'Q': 'Q'
+    }
+
+    _numpy_formats = {
+        'a': ('<i2', (32,)),
+        'b': 'i1',
+        'B': 'u1',
+        'h': '<i2',
+        'H': '<u2',
+        'i': '<i4',
+        'I': '<u4',
+        'f': '<f4',
+        'd': '<f8',
+        'n': 'S4',
+        'N': 'S16',
+        'Z': 'S64',
+        'c': '<i2',
+        'C': '<u2',
+        'e': '<i4',
+        'E': '<u4',
+        'L': '<i4',
+        'M': 'u1',
+        'q': '<i8',
+        'Q': '<u8'
+    }
+
+    def __init__(self, name, id, length, data_types, columns):
+        self.name = name
+        self.id = id
+        self.length = length
+        self.format_string = data_types
+        self.data_types = [MessageFormat._field_formats[char] for char in data_types]
+        self.data_types = {columns[i]: self.data_types[i] for i in range(len(columns))}
+        self.unpack_types = '=B' + ''.join([MessageFormat._unpack_formats[char] for char in data_types])
+        self.columns = ['MSGNAME'] + columns
+        self.size = struct.calcsize(self.unpack_types)
+        self._dtype = None
+
+    @property
+    def dtype(self):
+        """numpy structured dtype of a message, built on first use so that
+        reading metadata does not need to import numpy"""
+        if self._dtype is None:
+            import numpy as np
+            self._dtype = np.dtype([('MSGNAME', 'u1')] +
+                                   [(col, MessageFormat._numpy_formats[char])
+                                    for col, char in zip(self.columns[1:], self.format_string)])
+        return self._dtype
+
+    def unpack_records(self, raw, starts):
+        """Unpacks every message of this format in one step
+
+        Args:
+            raw (np.ndarray): The binary log as a uint8 array
+            starts (list<int>): Offsets of the type byte of each message
+
+        Returns:
+            np.ndarray: One record of this format's dtype per message
+        """
+        import numpy as np
+        # gather the messages into one block, then reinterpret the block
+        # through the structured dtype to unpack all the fields at once
+        starts = np.array(starts, dtype=np.intp)
+        return raw[starts[:, None] + np.arange(self.dtype.itemsize)].view(self.dtype)[:, 0]
+
+    def unpack_field(self, raw, starts, name):
+        """Unpacks one field of every message of this format, without touching
+        the rest of the message
+
+        Args:
+            raw (np.ndarray): The binary log as a uint8 array
+            starts (list<int>): Offsets of the type byte of each message
+            name (str): The column to unpack
+
+        Returns:
+            np.ndarray: The raw field values
+        """
+        import numpy as np
+        field_dtype, field_offset = self.dtype.fields[name][:2]
+        starts = np.array(starts, dtype=np.intp) + field_offset
+        return raw[starts[:, None] + np.arange(field_dtype.itemsize)].view(field_dtype)[:, 0]
+
+    def unpack_message(self, buf, offset):
+        """Unpacks a single message
+
+        Args:
+            buf (buffer): The binary log
+            offset (int): Offset of the message type byte
+
+        Returns:
+            dict: The message values keyed on column name
+        """
+        values = iter(struct.unpack_from(self.unpack_types, buf, offset)[1:])
+        message = {'MSGNAME': self.name}
+        for column, char in zip(self.columns[1:], self.format_string):
+            if char == 'a':
+                message[column] = list(itertools.islice(values, 32))
+                continue
+            value = next(values)
+            if isinstance(value, bytes):
+                value = value.decode('ascii').strip('\x00')
+            message[column] = value
+        return message
+
+    def unpack_columns(self, records):
+        """Converts unpacked binary records into table columns, widening numbers
+        to 64 bits and decoding strings as the text reader would.
+
+        Args:
+            records (np.ndarray): Records of this format's dtype
+
+        Returns:
+            dict<str, array>: The column values keyed on column name
+        """
+        import numpy as np
+        columns = {'MSGNAME': np.full(len(records), self.name, dtype=object)}
+        for name in self.dtype.names[1:]:
+            values = records[name]
+            if values.ndim > 1:
+                columns[name] = list(values)
+            elif values.dtype.kind == 'S':
+                columns[name] = np.char.strip(np.char.decode(values, 'ascii'), '\x00').astype(object)
+            elif values.dtype.kind == 'f':
+                columns[name] = values.astype(np.float64)
+            elif values.dtype == np.uint64:
+                # Q fields keep their full unsigned range
+                columns[name] = values.astype(np.uint64)
+            else:
+                columns[name] = values.astype(np.int64)
+        return columns
+
+    def __str__(self):
+        return "{}, {}, {}, {}, {}".format(self.name, self.id, self.length, self.unpack_types, self.columns)
+
+
+class BinFramer(object):
+    """Splits binary dataflash data into messages without copying it.
+
+    Messages are reported as offsets (of the message type byte) into the
+    buffer that was framed, so any object supporting the buffer protocol -
+    bytes, bytearray, memoryview or mmap - can be framed in place. FMT
+    messages are decoded as they are found and kept in `formats` so that
+    framing can continue over later buffers from the same log.
+    """
+
+    def __init__(self):
+        # type id -> (name, type id, length, format string, column labels)
+        self.formats = {}
+
+    def _lines(self, buf):
+        """Yields the (start, stop) of the data between consecutive markers"""
+        start = None
+        for match in _MARKER.finditer(buf):
+            if start is not None and start < match.start():
+                yield start, match.start()
+            start = match.end()
+        if start is not None and start < len(buf):
+            yield start, len(buf)
+
+    def _add_format(self, buf, start, stop):
+        try:
+            if stop - start < _FMT_STRUCT.size:
+                raise struct.error("FMT message too short")
+            (__, fmt_type, fmt_len, name, fmt_str, labels) = _FMT_STRUCT.unpack_from(buf, start)
+            name = name.decode('ascii').strip('\x00')
+            fmt_str = fmt_str.decode('ascii').strip('\x00')
+            labels = labels.decode('ascii').strip('\x00').split(',')
+            self.formats[fmt_type] = (name, fmt_type, fmt_len, fmt_str, labels)
+        except (struct.error, UnicodeDecodeError):
+            print("Error: Invalid Format Line")
+            print(bytes(buf[start:stop]))
+
+    def _is_complete(self, buf, current, stop):
+        return current is not None and buf[current] in self.formats and \
+            stop - current >= self.formats[buf[current]][2] - 2
+
+    def frame(self, buf, final=True):
+        """Finds the start of every complete message in a buffer.
+
+        A marker is only taken as the start of a new message if the following
+        type id is known and the message before it is long enough; otherwise
+        the marker bytes were part of the previous message's payload.
+
+        Args:
+            buf (buffer): The binary log data, starting at a message marker
+            final (bool, optional): Whether the buffer holds the end of the log.
+                If not, the last message is held back as it may still be
+                partially written. Defaults to True.
+
+        Returns:
+            (dict<int, list<int>>, int): The message offsets keyed on type id,
+                in the order the types were first seen, and the offset of the
+                marker starting the first message that was not framed
+        """
+        offsets = {}
+        current = None
+        for start, stop in self._lines(buf):
+            type_id = buf[start]
+            # an FMT at the end of a log that is still growing may be partial
+            if type_id == FMT_TYPE and (final or stop < len(buf) or stop - start >= _FMT_STRUCT.size):
+                self._add_format(buf, start, stop)
+            if current is None:
+                current = start
+            elif type_id in self.formats and \
+                    (buf[current] not in self.formats or self._is_complete(buf, current, start - 2)):
+                if buf[current] in self.formats:
+                    offsets.setdefault(buf[current], []).append(current)
+                current = start
+
+        if current is None:
+            match = _MARKER.search(buf)
+            remainder = match.start() if match is not None else max(len(buf) - 1, 0)
+            return offsets, remainder
+        if final:
+            if self._is_complete(buf, current, len(buf)):
+                offsets.setdefault(buf[current], []).append(current)
+            return offsets, len(buf)
+        return offsets, current - 2
@@ -1,86 +1,83 @@
 #!/usr/bin/env python3
 
-import argparse
-import struct
+import concurrent.futures
+import contextlib
+import io
+import os
+import sys
 import numpy as np
 import pandas as pd
-import datetime
-from log_parser.GPSTimeHelper import gps2utc
+from log_parser.GPSTimeHelper import gps_zero_time
+from log_parser.DFFramer import BinFramer, MessageFormat
+from log_parser.RowFilter import RowFilter
+from log_parser.SharedTables import SharedTables
+from log_parser.TimingStats import table_timing_stats
+from log_parser.LogWriter import write_text_log
+from log_parser.LogIO import (decompress_buffer, is_binary_log, open_log_input,
+                              open_log_output, read_stream)
 
 
 VALID_MSG_IDS = set(range(0, 256))
 
-class MessageFormat(object):
-    _field_formats = {
-        'a': str,
-        'b': int,
-        'B': int,
-        'h': int,
-        'H': int,
-        'i': int,
-        'I': int,
-        'f': float,
-        'd': float,
-        'n': str,
-        'N': str,
-        'Z': str,
-        'c': float,
-        'C': float,
-        'e': float,
-        'E': float,
-        'L': float,
-        'M': str,
-        'q': int,
-        'Q': int
-    }
-
-    _unpack_formats = {
-        'a': '32h',
-        'b': 'b',
-        'B': 'B',
-        'h': 'h',
-        'H': 'H',
-        'i': 'i',
-        'I': 'I',
-        'f': 'f',
-        'd': 'd',
-        'n': '4s',
-        'N': '16s',
-        'Z': '64s',
-        'c': 'h',
-        'C': 'H',
-        'e': 'i',
-        'E': 'I',
-        'L': 'i',
-        'M': 'B',
-        'q': 'q',
-        'Q': 'Q'
-    }
-
-    def __init__(self, name, id, length, data_types, columns):
-        self.name = name
-        self.id = id
-        self.length = length
-        self.data_types = [MessageFormat._field_formats[char] for char in data_types]
-        self.data_types = {columns[i]: self.data_types[i] for i in range(len(columns))}
-        self.unpack_types = '=B' + ''.join([MessageFormat._unpack_formats[char] for char in data_types])
-        self.columns = ['MSGNAME'] + columns
-
-    def __str__(self):
-        return "{}, {}, {}, {}, {}".format(self.name, self.id, self.length, self.unpack_types, self.columns)
+# Tables describing the log rather than holding data, never filtered by time
+FORMAT_TABLES = ('FMT', 'UNIT', 'MULT', 'FMTU')
+
+
+def _shard_filename(filename, index):
+    """Numbers a shard of an output log, keeping any compression extension"""
+    root, ext = os.path.splitext(filename)
+    if ext.lower() in ('.gz', '.zst', '.xz'):
+        root, inner_ext = os.path.splitext(root)
+        ext = inner_ext + ext
+    return f'{root}_{index:03d}{ext}'
+
+
+def _write_shard(filename, fmt_table, tables, time_shifts):
+    """Writes one shard of a split log, run in a worker process"""
+    with open_log_output(filename) as outfile:
+        write_text_log(outfile, fmt_table, tables, preamble=FORMAT_TABLES[1:], time_shifts=time_shifts)
+    return filename
+
 
-    
 class DFLog(object):
-    def __init__(self, filename, droppable_tables_filename=None):
-        self.tables = {}
+    def __init__(self, filename, droppable_tables_filename=None, filters=None, time_range=None):
+        """Reads a dataflash log
+
+        Args:
+            filename (str|bytes|file): The location of the log, '-' for stdin,
+                a bytes-like object holding the log, or a readable binary file
+            droppable_tables_filename (str, optional): File listing tables that may be
+                dropped to make space when merging. Defaults to None.
+            filters (dict<str, str>, optional): Conditions rows must meet to be kept,
+                keyed on table name, e.g. {'BAT': 'Curr > 18'}. See RowFilter for
+                the expression syntax. Defaults to None.
+            time_range ((int, int), optional): Only keep data rows with
+                start <= TimeUS < end. Defaults to None.
+        """
+        self.filename = filename
+        self.tables = SharedTables()
         self._data = {}
         self._formats = {}
         self._droppable_tables = []
-        
-        if filename[-3:].lower() == 'bin':
-            self._read_from_bin_file(filename)
+        self._filters = {name: RowFilter(expression) if isinstance(expression, str) else expression
+                         for name, expression in (filters or {}).items()}
+        self._time_range = time_range
+
+        # gzip/zstd/xz logs are decompressed on the fly, and the log type is
+        # taken from the content rather than the extension
+        if isinstance(filename, (bytes, bytearray, memoryview)):
+            self.filename = '<bytes>'
+            self._read_from_buffer(decompress_buffer(memoryview(filename)))
+        elif hasattr(filename, 'read') or filename == '-':
+            infile = sys.stdin.buffer if filename == '-' else filename
+            self.filename = getattr(infile, 'name', '<stream>')
+            self._read_from_buffer(decompress_buffer(memoryview(read_stream(infile))))
         else:
-            self._read_from_file(filename)
+            with open_log_input(filename) as infile:
+                if is_binary_log(infile.peek(4096)):
+                    self._read_from_bin_file(infile)
+                else:
+                    self._read_from_file(infile)
 
         # Makes renaming fmt id numbers easier later
         self.tables['FMT']['Type'] = pd.to_numeric(self.tables['FMT']['Type'])
@@ -96,16 +93,76 @@ class DFLog(object):
             self._read_droppable_tables(droppable_tables_filename)
 
         self.gps_zero_time = None
-        if "GPS" in self.tables:
+        if "GPS" in self.tables and len(self.tables['GPS']) > 0:
             self.gps_zero_time = self._find_gps_zero()
 
+    @classmethod
+    def from_bytes(cls, buf, droppable_tables_filename=None, filters=None, time_range=None):
+        """Reads a log held in memory. Uncompressed binary logs are parsed
+        directly from the buffer without copying it.
+
+        Args:
+            buf (bytes|bytearray|memoryview): The log contents
+            droppable_tables_filename, filters, time_range: As for DFLog
+
+        Returns:
+            DFLog: The parsed log
+        """
+        return cls(memoryview(buf), droppable_tables_filename, filters=filters, time_range=time_range)
+
+    @classmethod
+    def from_fileobj(cls, fileobj, droppable_tables_filename=None, filters=None, time_range=None):
+        """Reads a log from a readable binary file object, such as a socket file,
+        an upload stream or sys.stdin.buffer
+
+        Args:
+            fileobj (file): The stream to read the log from, it is not closed
+            droppable_tables_filename, filters, time_range: As for DFLog
+
+        Returns:
+            DFLog: The parsed log
+        """
+        return cls(fileobj, droppable_tables_filename, filters=filters, time_range=time_range)
+
     def _find_gps_zero(self):
-        first_gps_time = gps2utc(
-            int(self.tables['GPS']["GWk"].iloc[0]), 
-            int(self.tables['GPS']["GMS"].iloc[0])/1000.0)
-        gps_ms_time = int(self.tables['GPS']['TimeUS'].iloc[0])/1000
-        return first_gps_time - datetime.timedelta(milliseconds=gps_ms_time)
+        return gps_zero_time(int(self.tables['GPS']["GWk"].iloc[0]),
+                             int(self.tables['GPS']["GMS"].iloc[0]),
+                             int(self.tables['GPS']['TimeUS'].iloc[0]))
+
 
+    def timing_stats(self):
+        """Computes message rate, jitter, gap and ordering statistics from the
+        TimeUS column of every table, to spot dropped or late sensor data
+
+        Returns:
+            pd.DataFrame: One row per table with the count, duration_s,
+                mean_rate_hz, median_rate_hz, jitter_us, max_gap_us,
+                max_gaps [(TimeUS, gap)] and out_of_order messages
+        """
+        return table_timing_stats(self.tables)
+
+    def _row_filter(self, name, columns):
+        """Combines the filter and time range that apply to a table
+
+        Args:
+            name (str): The table name
+            columns (list<str>): The table columns
+
+        Returns:
+            RowFilter: The rows to keep, or None to keep every row
+        """
+        expressions = []
+        if name in self._filters:
+            expressions.append(f'({self._filters[name]})')
+        if self._time_range is not None and 'TimeUS' in columns and name not in FORMAT_TABLES:
+            expressions.append(f'{int(self._time_range[0])} <= TimeUS < {int(self._time_range[1])}')
+        if len(expressions) == 0:
+            return None
+        row_filter = RowFilter(' and '.join(expressions))
+        unknown = row_filter.fields - set(columns)
+        if len(unknown) > 0:
+            raise ValueError(f'Filter on {name} uses unknown fields {", ".join(sorted(unknown))}')
+        return row_filter
 
     def _drop_empty_format_msgs(self):
         unused_format_names = set(self.tables['FMT']['Name']) - set(self.tables.keys())
@@ -121,14 +178,20 @@ class DFLog(object):
                 if table_name in self.tables:
                     self._droppable_tables.append(table_name)
     
-    def _read_from_file(self, filename):
+    def _read_from_buffer(self, buf):
+        if is_binary_log(buf[:4096]):
+            self._read_from_bin_buffer(buf)
+        else:
+            self._read_from_file(io.BytesIO(buf))
+
+    def _read_from_file(self, infile):
         """Reads a log file into the datastructure
 
         Args:
-            filename (str): The location of the input log`
+            infile (io.BufferedReader): The decompressed input log
         """
-        with open(filename, 'r') as infile:
-            for line in infile:
+        with io.TextIOWrapper(infile) as textfile:
+            for line in textfile:
                 data = [val.strip() for val in line.split(',')]
                 # if data[0] == 'FMT':
                 #     self.tables[data[3]] = pd.DataFrame(columns=data[5:])
@@ -136,75 +199,41 @@ class DFLog(object):
                 self._add_row(data[0], data[1:])
         self._format_tables()
 
-    def _read_from_bin_file(self, filename):
-        with open(filename, 'rb') as infile:
-            self._data['LINES'] = []
-            for line in self._bin_splitter(infile):
-                if line == b'':
-                    continue
-                type_id = line[0]
-                # FMT handle
-                if type_id == 128:
-                    self._handle_bin_fmt(line)
-                self._data['LINES'].append(line)
-        try:
-            current = self._data['LINES'][0]        
-            for line in self._data['LINES'][1:]:
-                if line[0] in self._formats and len(current) >= self._formats[current[0]].length-2:
-                    self._add_bin_row(current[0], current)
-                    current = line
-                else:
-                    current = current + b'\xA3\x95' + line
-            self._data.pop('LINES')
-            if len(current) >= self._formats[current[0]].length-2:
-                self._add_bin_row(current[0], current)
-            self._format_bin_tables()
-        except IndexError:
-            print(f'Error: No valid lines in file {filename}')
+    def _read_from_bin_file(self, infile):
+        self._read_from_bin_buffer(memoryview(read_stream(infile)))
 
-    def _handle_bin_fmt(self, line):
-        try:
-            (__, fmt_type, fmt_len, name, fmt_str, labels) = struct.unpack("BBB4s16s64s", line[:87])
-            name=name.decode('ascii').strip('\x00')
-            fmt_str = fmt_str.decode('ascii').strip('\x00')
-            labels = labels.decode('ascii').strip('\x00').split(',')
-            self._formats[fmt_type] = MessageFormat(name, fmt_type, fmt_len, fmt_str, labels)
-        except struct.error:
-            print("Error: Invalid Format Line")
-            print(line)
-
-    def _bin_splitter(self, filehandle):
-        marker = b'\xA3\x95'
-        blocksize = 4096
-        current = b''
-        result = b''
-        for block in iter(lambda: filehandle.read(blocksize), b''):
-            current += block
-            while True:
-                markerpos = current.find(marker)
-                if markerpos == -1:
-                    break
-                result = current[:markerpos]
-                current = current[markerpos + len(marker):]
-                yield result
-        yield current
-
-    def _add_bin_row(self, type_id, data):
-        if not type_id in self._data:
-            self._data[type_id] = []
-        self._data[type_id].append(data)
-
-    def _format_bin_tables(self):
+    def _read_from_bin_buffer(self, buf):
+        """Reads a binary log held in memory into the datastructure. The buffer
+        is framed and unpacked in place, without copying it.
+
+        Args:
+            buf (memoryview): The uncompressed binary log
+        """
+        framer = BinFramer()
+        self._data, __ = framer.frame(buf)
+        for type_id, fmt in framer.formats.items():
+            self._formats[type_id] = MessageFormat(*fmt)
+        if len(self._data) == 0:
+            print(f'Error: No valid lines in file {self.filename}')
+            return
+        self._format_bin_tables(buf)
+
+    def _format_bin_tables(self, buf):
+        raw = np.frombuffer(buf, dtype=np.uint8)
         for type_id in self._data:
             fmt = self._formats[type_id]
-            data = [struct.unpack(fmt.unpack_types, row[:fmt.length-2])[:len(fmt.columns)]
-                        for row in self._data[type_id]]
-
-            self.tables[fmt.name] = pd.DataFrame(data, columns=fmt.columns)
-            self.tables[fmt.name]['MSGNAME'] = fmt.name
-            for column in self.tables[fmt.name].columns:
-                if type(self.tables[fmt.name][column].iloc[0]) == bytes:
-                    self.tables[fmt.name][column] = self.tables[fmt.name][column].apply(lambda x: x.decode('ascii').strip('\x00'))
+            if fmt.size != fmt.length - 2:
+                print(f'Error: Format {fmt.name} length {fmt.length} does not match its fields')
+                continue
+            starts = self._data[type_id]
+            row_filter = self._row_filter(fmt.name, fmt.columns)
+            if row_filter is not None:
+                # evaluate the filter on just the fields it uses, then only
+                # unpack and decode the messages that are kept
+                fields = {name: fmt.unpack_field(raw, starts, name) for name in row_filter.fields}
+                starts = np.asarray(starts)[row_filter.mask(fields)]
+            records = fmt.unpack_records(raw, starts)
+            self.tables[fmt.name] = pd.DataFrame(fmt.unpack_columns(records), columns=fmt.columns)
 
     def _add_row(self, name, data):
         """Add a new row of data to the appropriate table.
@@ -244,6 +273,10 @@ class DFLog(object):
             #make all FMTU messages start at the begining of the file
             if name == 'FMTU': 
                 data[:, 1] = 0
+            row_filter = self._row_filter(name, fmt.columns)
+            if row_filter is not None:
+                data = data[row_filter.mask({column: data[:, fmt.columns.index(column)]
+                                             for column in row_filter.fields})]
             self.tables[name] = pd.DataFrame(data, columns=fmt.columns)
             
 
@@ -259,46 +292,151 @@ class DFLog(object):
         """        
         return name+", " + ", ".join(map(str, self.tables[name].iloc[row])) + '\n'
 
-    def output_log(self, filename, timestamp='TimeUS'):
-        """Outputs the stored tables as a dataflash log
+    def output_log(self, filename, timestamp='TimeUS', split=None, workers=None):
+        """Outputs the stored tables as a dataflash log. Filenames ending in .gz,
+        .zst or .xz are compressed while the log is written.
 
         Args:
-            filename (str): The location to save the file
+            filename (str|file): The location to save the file, '-' for stdout,
+                or a writable text or binary stream, which is left open
             timestamp (str, optional): The column sort messages on. Defaults to 'TimeUS'.
+            split (str|float|list, optional): Write one log per segment instead:
+                'flights' for each arm to disarm (see find_flight_segments), a
+                number of seconds for fixed windows, or a list of (start, end)
+                TimeUS. Shards are named <name>_001.log and so on, and every
+                shard starts with the full FMT, UNIT, MULT and FMTU messages.
+                Defaults to None.
+            workers (int, optional): Number of processes writing shards, defaulting
+                to one per CPU. Without split, the number of processes formatting
+                tables, defaulting to formatting them in this process.
+
+        Returns:
+            list<str>: The shard filenames when split is given
         """    
+        if split is not None:
+            return self._output_shards(filename, split, timestamp, workers)
 
-        with open(filename, 'w') as __:
-            # Clear out the file
-            pass    
-        with open(filename, 'a') as outfile:
-            # First, write the format messages
-            # add the type column back (from the index)
+        # keep progress messages out of the log when it is piped to stdout
+        to_stdout = isinstance(filename, str) and filename == '-' or filename is sys.stdout
+        diagnostics = contextlib.redirect_stdout(sys.stderr) if to_stdout else contextlib.nullcontext()
+        with open_log_output(filename) as outfile, diagnostics:
             print(self.tables['FMT'])
-            self.tables['FMT'].insert(1, 'Type', self.tables['FMT'].index)
-            fmt_np = self.tables['FMT'].to_numpy()
-            np.savetxt(outfile, fmt_np, fmt='%s', delimiter=',', newline='\n')
-            
-            # Write the rest of the log, sorted by timestamp
-            numpy_msgs = None
-            for table in self.tables:
-                if table == 'FMT':
-                    continue
-                if 'TimeUS' not in self.tables[table]:
-                    continue
-                temp_array = self.tables[table].to_numpy()
-                temp_array = np.hstack([temp_array[:, :1], 
-                                        np.reshape([np.uint64(val) for val in temp_array[:, 1]], 
-                                                   (len(temp_array), 1)),
-                                        np.reshape([", ".join([str(x) 
-                                                         for x in row]) 
-                                                    for row in temp_array[:, 2:]],
-                                                    (len(temp_array), 1))])
-                if numpy_msgs is None:
-                    numpy_msgs = temp_array
-                else:
-                    numpy_msgs = np.vstack((numpy_msgs, temp_array))
-            numpy_msgs = numpy_msgs[numpy_msgs[:, 1].astype(np.uint64).argsort()]
-            np.savetxt(outfile, numpy_msgs, fmt='%s', delimiter=', ', newline='\n')
+            # shifts left by merging with shared tables are applied as the log is written
+            tables, time_shifts = self._unshifted_tables()
+            if workers is None or workers == 1:
+                write_text_log(outfile, self._fmt_table(), tables, time_shifts=time_shifts)
+            else:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                    write_text_log(outfile, self._fmt_table(), tables, executor=executor,
+                                   time_shifts=time_shifts)
+
+    def _unshifted_tables(self):
+        if isinstance(self.tables, SharedTables):
+            return self.tables.unshifted(), dict(self.tables.time_shifts)
+        return self.tables, {}
+
+    def _fmt_table(self):
+        # add the type column back (from the index)
+        fmt_table = self.tables['FMT'].copy()
+        fmt_table.insert(1, 'Type', fmt_table.index)
+        return fmt_table
+
+    def _time_extent(self, timestamp='TimeUS'):
+        """Returns the first and last timestamp of the data tables"""
+        tables, time_shifts = self._unshifted_tables()
+        times = [pd.to_numeric(table[timestamp]) + time_shifts.get(name, 0) for name, table in tables.items()
+                 if name not in FORMAT_TABLES and timestamp in table.columns and len(table) > 0]
+        if len(times) == 0:
+            return 0, 0
+        return int(min(t.min() for t in times)), int(max(t.max() for t in times))
+
+    def find_flight_segments(self, current=None, gap=10):
+        """Finds the flights in the log, from the ARM messages or, if there are
+        none or current is given, from windows of high battery current like the
+        ones find_offset detects
+
+        Args:
+            current (float, optional): BAT.Curr at or above which the craft is
+                flying. Defaults to None, using ARM messages when present or 18.
+            gap (float, optional): High current windows less than this many
+                seconds apart belong to the same flight. Defaults to 10.
+
+        Returns:
+            list<(int, int)>: The (start, end) TimeUS of each flight
+        """
+        __, log_end = self._time_extent()
+        if current is None and 'ARM' in self.tables and len(self.tables['ARM']) > 0:
+            arm_times = pd.to_numeric(self.tables['ARM']['TimeUS']).to_numpy()
+            armed = pd.to_numeric(self.tables['ARM']['ArmState']).to_numpy() != 0
+            segments = []
+            start = None
+            for time_us, is_armed in zip(arm_times, armed):
+                if is_armed and start is None:
+                    start = int(time_us)
+                elif not is_armed and start is not None:
+                    segments.append((start, int(time_us) + 1))
+                    start = None
+            if start is not None:
+                segments.append((start, log_end + 1))
+            return segments
+
+        if 'BAT' not in self.tables or len(self.tables['BAT']) == 0:
+            return []
+        times = pd.to_numeric(self.tables['BAT']['TimeUS']).to_numpy()
+        flying = pd.to_numeric(self.tables['BAT']['Curr']).to_numpy() >= (18 if current is None else current)
+        if not flying.any():
+            return []
+        flying_times = times[flying]
+        # a new flight starts wherever the high current samples are a gap apart
+        breaks = np.flatnonzero(np.diff(flying_times) > gap * 1e6)
+        starts = np.concatenate(([flying_times[0]], flying_times[breaks + 1]))
+        ends = np.concatenate((flying_times[breaks], [flying_times[-1]])) + 1
+        return [(int(start), int(end)) for start, end in zip(starts, ends)]
+
+    def _shard_windows(self, split, timestamp):
+        if isinstance(split, str):
+            if split != 'flights':
+                raise ValueError(f'Unknown split "{split}", expected "flights", seconds or (start, end) pairs')
+            return self.find_flight_segments()
+        if isinstance(split, (int, float)):
+            if int(split * 1e6) <= 0:
+                raise ValueError(f'Split windows must be at least one microsecond long, not {split} seconds')
+            first, last = self._time_extent(timestamp)
+            edges = np.arange(first, last + 1, int(split * 1e6))
+            return [(int(start), int(start + split * 1e6)) for start in edges]
+        return [(int(start), int(end)) for start, end in split]
+
+    def _output_shards(self, filename, split, timestamp='TimeUS', workers=None):
+        if not isinstance(filename, str) or filename == '-':
+            raise ValueError('Split logs need an output filename to number the shards from')
+        windows = self._shard_windows(split, timestamp)
+
+        # find each window in every table by binary search on its timestamps
+        tables, time_shifts = self._unshifted_tables()
+        bounds = {}
+        for name, table in tables.items():
+            if name in FORMAT_TABLES or timestamp not in table.columns:
+                continue
+            times = pd.to_numeric(table[timestamp]).to_numpy() + time_shifts.get(name, 0)
+            if np.all(times[1:] >= times[:-1]):
+                bounds[name] = [tuple(np.searchsorted(times, window)) for window in windows]
+            else:
+                bounds[name] = [np.flatnonzero((times >= start) & (times < end)) for start, end in windows]
+
+        fmt_table = self._fmt_table()
+        jobs = []
+        for index in range(len(windows)):
+            shard_tables = {name: tables[name] for name in FORMAT_TABLES if name in tables}
+            for name, table_bounds in bounds.items():
+                rows = table_bounds[index]
+                shard_tables[name] = tables[name].iloc[rows[0]:rows[1]] if isinstance(rows, tuple) \
+                    else tables[name].iloc[rows]
+            jobs.append((_shard_filename(filename, index + 1), fmt_table, shard_tables, time_shifts))
+
+        if workers == 1 or len(jobs) <= 1:
+            return [_write_shard(*job) for job in jobs]
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_write_shard, *zip(*jobs)))
 
     def renumber_msg(self, old_msg_type, new_msg_type):
         self.tables['FMT'].rename(index={old_msg_type: new_msg_type}, inplace=True)
@@ -339,12 +477,17 @@ class DFLog(object):
         return -1
 
 
-    def merge(self, other, drop_tables=None, time_shift=0, gps_time_shift=False):
+    def merge(self, other, drop_tables=None, time_shift=0, gps_time_shift=False, share_tables=False):
         """Merges a DFParser object into this object. Has side effects on other
 
         Args:
             other (DFParser): The log data to add
             drop_tables (list<str>, optional) : Names of tables to not include in the merge. Defaults to None
+            share_tables (bool, optional): Keep other's tables as they are and only
+                record the time shift of each table (see SharedTables), rather than
+                rewriting the TimeUS column of every shifted table. Shifts are
+                applied when a table is looked up or written, so merging many logs
+                straight to a file never copies their tables. Defaults to False.
         """        
         
         # find collisions
@@ -390,6 +533,10 @@ class DFLog(object):
             
             print(f'calc ts: {time_shift}')
         
+        if share_tables:
+            self._share_tables(other, merge_names, time_shift)
+            return
+
         if time_shift > 0:
             for name in merge_names:
                 if "TimeUS" in other.tables[name].columns:
@@ -403,6 +550,22 @@ class DFLog(object):
 
         for name in merge_names:
             self.tables[name] = other.tables[name]
+
+    def _share_tables(self, other, merge_names, time_shift):
+        """Adds other's tables by reference, recording time shifts instead of applying them"""
+        if not isinstance(self.tables, SharedTables):
+            self.tables = SharedTables(self.tables)
+        tables, __ = self._unshifted_tables()
+        other_tables, other_shifts = other._unshifted_tables()
+        if time_shift <= 0:
+            for name in tables:
+                if name not in FORMAT_TABLES and "TimeUS" in tables[name].columns:
+                    self.tables.shift(name, int(-time_shift*1e6))
+
+        for name in merge_names:
+            self.tables[name] = other_tables[name]
+            if "TimeUS" in other_tables[name].columns and (time_shift > 0 or name in other_shifts):
+                self.tables.shift(name, other_shifts.get(name, 0) + (int(time_shift*1e6) if time_shift > 0 else 0))
     
     def find_offset(self, other,  bgu_current=18):
         # Check if self is a craft log, and other has ISP data
@@ -420,29 +583,9 @@ class DFLog(object):
             return 0
 
 if __name__ == "__main__":
-
     # Takes a list of files and a list of tables to drop from incoming files
-    parser = argparse.ArgumentParser()
-    parser.add_argument("output", help="The new log file to output into")
-    parser.add_argument("base", help="The primary file to merge into")
-    parser.add_argument("-f", "--files", help="Paths of files to merge", nargs="+")
-    parser.add_argument('-d', '--drop', help='The names of fields to drop from incoming files', nargs='*')
-    parser.add_argument('-t', '--time_shift', help='Number of milliseconds to shift incoming files by', type=int, default=0)
-    parser.add_argument('-a', '--auto_shift', help='The name of a file to merge with automatic time shifting')
-    args = parser.parse_args()
-
-    
-    log = DFLog(args.base)
-    ts = args.time_shift
-    if args.auto_shift is not None:
-        ips_log = DFLog(args.auto_shift)
-        ts += log.find_offset(ips_log)
-        log.merge(ips_log, drop_tables=args.drop,
-                  time_shift=ts, gps_time_shift=False)
-    if args.files is not None:
-        for f in args.files:
-            log.merge(DFLog(f), drop_tables=args.drop, time_shift=ts, gps_time_shift=True)
-    log.output_log(args.output)
+    from log_parser.cli import merge_main
+    merge_main()
 
 
 
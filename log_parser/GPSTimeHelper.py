@@ -37,3 +37,13 @@ def gps2utc(week, secs):
     date_before_leaps = gps_epoch + \
         timedelta(seconds=week * secs_in_week + secs)
     return date_before_leaps - timedelta(seconds=leap(date_before_leaps))
+
+
+def gps_zero_time(week, gps_ms, time_us):
+    """
+    :param week: GPS week number of a GPS message
+    :param gps_ms: milliseconds since the beginning of `week` of the message
+    :param time_us: log timestamp (TimeUS) of the message
+    :return: datetime instance with the UTC time of log timestamp zero
+    """
+    return gps2utc(week, gps_ms / 1000.0) - timedelta(milliseconds=time_us / 1000)
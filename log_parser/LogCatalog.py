@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+from log_parser.DFFramer import BinFramer, MessageFormat
+from log_parser.GPSTimeHelper import gps_zero_time
+from log_parser.LogIO import open_log_input, read_stream
+
+
+LOG_EXTENSIONS = ('.bin', '.bin.gz', '.bin.zst', '.bin.xz')
+
+# Number of MSG messages kept per log - the firmware, OS and hardware
+# versions are written at the start of every log
+MSG_LINES = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    first_time_us INTEGER,
+    last_time_us INTEGER,
+    gps_zero_time TEXT
+);
+CREATE TABLE IF NOT EXISTS formats (
+    log_id INTEGER NOT NULL,
+    type INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    columns TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    log_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first_time_us INTEGER,
+    last_time_us INTEGER
+);
+CREATE TABLE IF NOT EXISTS msg_text (
+    log_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    time_us INTEGER,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS formats_log ON formats (log_id);
+CREATE INDEX IF NOT EXISTS messages_log ON messages (log_id);
+CREATE INDEX IF NOT EXISTS messages_name ON messages (name);
+CREATE INDEX IF NOT EXISTS msg_text_log ON msg_text (log_id);
+"""
+
+
+class LogSummary(object):
+    """Metadata of a binary log, gathered without building any tables"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.formats = []
+        # name -> [count, first TimeUS, last TimeUS]
+        self.messages = {}
+        # (TimeUS, text) of the first MSG_LINES MSG messages
+        self.msg_text = []
+        self.first_time_us = None
+        self.last_time_us = None
+        self.gps_zero_time = None
+
+
+def scan_log(filename):
+    """Collects the metadata of a binary log in a single framing pass. Only the
+    first and last message of each type, and the first MSG and GPS messages,
+    are unpacked.
+
+    Args:
+        filename (str): The location of the (optionally compressed) binary log
+
+    Returns:
+        LogSummary: The log metadata
+    """
+    with open_log_input(filename) as infile:
+        buf = memoryview(read_stream(infile))
+    framer = BinFramer()
+    offsets, __ = framer.frame(buf)
+    formats = {type_id: MessageFormat(*fmt) for type_id, fmt in framer.formats.items()}
+
+    summary = LogSummary(filename)
+    summary.formats = [(type_id, fmt.name, fmt.length, fmt.format_string, ','.join(fmt.columns[1:]))
+                       for type_id, fmt in formats.items()]
+    for type_id, starts in offsets.items():
+        fmt = formats[type_id]
+        first_time = last_time = None
+        readable = fmt.size == fmt.length - 2
+        if readable and 'TimeUS' in fmt.columns:
+            first_time = int(fmt.unpack_message(buf, starts[0])['TimeUS'])
+            last_time = int(fmt.unpack_message(buf, starts[-1])['TimeUS'])
+            if summary.first_time_us is None or first_time < summary.first_time_us:
+                summary.first_time_us = first_time
+            if summary.last_time_us is None or last_time > summary.last_time_us:
+                summary.last_time_us = last_time
+        summary.messages[fmt.name] = [len(starts), first_time, last_time]
+
+        if readable and fmt.name == 'MSG':
+            for start in starts[:MSG_LINES]:
+                message = fmt.unpack_message(buf, start)
+                summary.msg_text.append((int(message.get('TimeUS', 0)), message['Message']))
+        if readable and fmt.name == 'GPS':
+            gps = fmt.unpack_message(buf, starts[0])
+            summary.gps_zero_time = gps_zero_time(int(gps['GWk']), int(gps['GMS']), int(gps['TimeUS']))
+    return summary
+
+
+def find_logs(root):
+    """Lists the binary logs in a directory tree
+
+    Args:
+        root (str): The folder to search
+
+    Returns:
+        list<str>: Paths of the logs found
+    """
+    found = []
+    for folder, __, files in os.walk(root):
+        found.extend(os.path.join(folder, f) for f in files if f.lower().endswith(LOG_EXTENSIONS))
+    return sorted(found)
+
+
+class LogCatalog(object):
+    """SQLite index of the metadata of every binary log in a directory tree.
+
+    Logs are only rescanned when their modification time or size changes, so
+    keeping a catalog up to date is cheap, and fleet wide questions can be
+    answered without parsing any logs.
+    """
+
+    def __init__(self, db_filename):
+        self._db = sqlite3.connect(db_filename)
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def _forget(self, log_id):
+        for table in ('formats', 'messages', 'msg_text'):
+            self._db.execute(f'DELETE FROM {table} WHERE log_id = ?', (log_id,))
+        self._db.execute('DELETE FROM logs WHERE id = ?', (log_id,))
+
+    def index_log(self, filename):
+        """Scans a log and (re)writes its catalog entry
+
+        Args:
+            filename (str): The location of the binary log
+        """
+        filename = os.path.abspath(filename)
+        stat = os.stat(filename)
+        summary = scan_log(filename)
+        with self._db:
+            row = self._db.execute('SELECT id FROM logs WHERE path = ?', (filename,)).fetchone()
+            if row is not None:
+                self._forget(row[0])
+            gps_zero = summary.gps_zero_time.isoformat() if summary.gps_zero_time is not None else None
+            log_id = self._db.execute(
+                'INSERT INTO logs (path, mtime, size, first_time_us, last_time_us, gps_zero_time) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (filename, stat.st_mtime, stat.st_size, summary.first_time_us,
+                 summary.last_time_us, gps_zero)).lastrowid
+            self._db.executemany('INSERT INTO formats VALUES (?, ?, ?, ?, ?, ?)',
+                                 [(log_id,) + fmt for fmt in summary.formats])
+            self._db.executemany('INSERT INTO messages VALUES (?, ?, ?, ?, ?)',
+                                 [(log_id, name) + tuple(values) for name, values in summary.messages.items()])
+            self._db.executemany('INSERT INTO msg_text VALUES (?, ?, ?, ?)',
+                                 [(log_id, seq, time_us, text)
+                                  for seq, (time_us, text) in enumerate(summary.msg_text)])
+
+    def update(self, root):
+        """Brings the catalog up to date with the logs in a directory tree. New and
+        changed logs are scanned, logs that no longer exist are removed.
+
+        Args:
+            root (str): The folder to index
+
+        Returns:
+            (int, int): The number of logs scanned and removed
+        """
+        root = os.path.abspath(root)
+        known = {path: (mtime, size) for path, mtime, size in
+                 self._db.execute('SELECT path, mtime, size FROM logs')}
+        scanned = 0
+        for filename in find_logs(root):
+            stat = os.stat(filename)
+            if known.get(filename) == (stat.st_mtime, stat.st_size):
+                continue
+            try:
+                self.index_log(filename)
+                scanned += 1
+            except Exception as e:
+                print(f'Error: Could not index {filename}: {e}')
+
+        removed = 0
+        prefix = os.path.join(root, '')
+        with self._db:
+            for path in known:
+                if path.startswith(prefix) and not os.path.exists(path):
+                    self._forget(self._db.execute('SELECT id FROM logs WHERE path = ?', (path,)).fetchone()[0])
+                    removed += 1
+        return scanned, removed
+
+    def logs_containing(self, name):
+        """Returns the paths of logs with at least one message of a type, e.g. 'BGU1'"""
+        return [row[0] for row in self._db.execute(
+            'SELECT logs.path FROM logs JOIN messages ON messages.log_id = logs.id '
+            'WHERE messages.name = ? AND messages.count > 0 ORDER BY logs.path', (name,))]
+
+    def logs_with_text(self, text):
+        """Returns the paths of logs whose first MSG messages contain some text,
+        such as a firmware version"""
+        return [row[0] for row in self._db.execute(
+            'SELECT DISTINCT logs.path FROM logs JOIN msg_text ON msg_text.log_id = logs.id '
+            "WHERE msg_text.message LIKE '%' || ? || '%' ORDER BY logs.path", (text,))]
+
+    def time_ranges(self):
+        """Returns (path, first TimeUS, last TimeUS) for every log"""
+        return self._db.execute(
+            'SELECT path, first_time_us, last_time_us FROM logs ORDER BY path').fetchall()
+
+    def gps_zero_time(self, filename):
+        """Returns the UTC time of TimeUS zero of a log, or None if it has no GPS fix"""
+        row = self._db.execute('SELECT gps_zero_time FROM logs WHERE path = ?',
+                               (os.path.abspath(filename),)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return datetime.fromisoformat(row[0])
+
+    def message_counts(self, filename):
+        """Returns the number of messages of each type in a log"""
+        return dict(self._db.execute(
+            'SELECT messages.name, messages.count FROM messages JOIN logs ON messages.log_id = logs.id '
+            'WHERE logs.path = ?', (os.path.abspath(filename),)))
+
+    def msg_text(self, filename):
+        """Returns the first MSG messages of a log"""
+        return [row[0] for row in self._db.execute(
+            'SELECT msg_text.message FROM msg_text JOIN logs ON msg_text.log_id = logs.id '
+            'WHERE logs.path = ? ORDER BY msg_text.seq', (os.path.abspath(filename),))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("catalog", help="The SQLite catalog file")
+    parser.add_argument("-u", "--update", help="Folder of logs to index before querying")
+    parser.add_argument("-c", "--contains", help="List logs containing this message type")
+    parser.add_argument("-m", "--msg", help="List logs with this text in their first MSG messages")
+    parser.add_argument("-r", "--ranges", help="List the TimeUS range of every log", action='store_true')
+    args = parser.parse_args()
+
+    with LogCatalog(args.catalog) as catalog:
+        if args.update is not None:
+            scanned, removed = catalog.update(args.update)
+            print(f'{scanned} logs indexed, {removed} removed')
+        if args.contains is not None:
+            print('\n'.join(catalog.logs_containing(args.contains)))
+        if args.msg is not None:
+            print('\n'.join(catalog.logs_with_text(args.msg)))
+        if args.ranges:
+            for path, first, last in catalog.time_ranges():
+                print(f'{path}, {first}, {last}')
@@ -0,0 +1,234 @@
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import queue
+import sys
+import threading
+
+
+# Size of the reads fed to the binary framer, and of the chunks handed to the
+# compression thread when writing
+BLOCK_SIZE = 1 << 20
+
+BIN_MARKER = b'\xA3\x95'
+
+_MAGIC_NUMBERS = {
+    'gz': b'\x1f\x8b',
+    'zst': b'\x28\xb5\x2f\xfd',
+    'xz': b'\xfd7zXZ\x00',
+}
+
+_EXTENSIONS = {
+    '.gz': 'gz',
+    '.zst': 'zst',
+    '.xz': 'xz',
+}
+
+
+def _require_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is required to read or write .zst logs - "
+                          "install it with `pip install zstandard`")
+    return zstandard
+
+
+def detect_compression(header):
+    """Finds the compression codec of a stream from its first bytes
+
+    Args:
+        header (bytes): At least the first 6 bytes of the stream
+
+    Returns:
+        str: One of 'gz', 'zst' or 'xz', or None for an uncompressed stream
+    """
+    for codec, magic in _MAGIC_NUMBERS.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+
+def is_binary_log(sample):
+    """Checks whether the start of a (decompressed) log is a binary dataflash log.
+
+    Binary logs start with the message header marker, text logs are plain
+    ASCII, so a null byte or a marker in the sample also means binary.
+
+    Args:
+        sample (bytes): The first few KiB of the log
+
+    Returns:
+        bool: True if the log is binary
+    """
+    sample = bytes(sample[:4096])
+    return sample.startswith(BIN_MARKER) or BIN_MARKER in sample or b'\x00' in sample
+
+
+def _open_decompressor(codec, raw):
+    if codec == 'gz':
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if codec == 'xz':
+        return lzma.LZMAFile(raw, mode='rb')
+    return _require_zstandard().ZstdDecompressor().stream_reader(raw, read_size=BLOCK_SIZE,
+                                                                     read_across_frames=True)
+
+
+@contextlib.contextmanager
+def open_log_input(filename):
+    """Opens a log for binary reading, transparently decompressing gzip, zstd and
+    xz files. The codec is detected from the magic bytes, not the extension.
+
+    Args:
+        filename (str): The location of the input log
+
+    Yields:
+        io.BufferedReader: The decompressed byte stream, supports peek()
+    """
+    with open(filename, 'rb', buffering=BLOCK_SIZE) as raw:
+        codec = detect_compression(raw.peek(6)[:6])
+        if codec is None:
+            yield raw
+            return
+        with _open_decompressor(codec, raw) as stream:
+            yield io.BufferedReader(stream, buffer_size=BLOCK_SIZE)
+
+
+def read_stream(stream):
+    """Reads a binary stream to the end in large blocks
+
+    Args:
+        stream (file): A readable binary stream, it is not closed
+
+    Returns:
+        bytearray: The stream contents
+    """
+    data = bytearray()
+    for block in iter(lambda: stream.read(BLOCK_SIZE), b''):
+        data += block
+    return data
+
+
+def decompress_buffer(buf):
+    """Decompresses an in-memory log if it is gzip, zstd or xz compressed
+
+    Args:
+        buf (memoryview): The log contents
+
+    Returns:
+        memoryview: The decompressed contents, or buf itself if it was not compressed
+    """
+    codec = detect_compression(bytes(buf[:6]))
+    if codec is None:
+        return buf
+    with _open_decompressor(codec, io.BytesIO(buf)) as stream:
+        return memoryview(read_stream(stream))
+
+
+class CompressingWriter(io.TextIOBase):
+    """Text stream that compresses its output on a background thread.
+
+    Writes are collected into large blocks and handed over through a bounded
+    queue, so formatting of the next block overlaps with compression of the
+    previous one.
+    """
+
+    def __init__(self, filename, codec, queue_depth=4):
+        self._raw = open(filename, 'wb')
+        if codec == 'gz':
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6)
+        elif codec == 'xz':
+            self._stream = lzma.LZMAFile(self._raw, mode='wb')
+        else:
+            self._stream = _require_zstandard().ZstdCompressor().stream_writer(self._raw)
+        self._pending = []
+        self._pending_size = 0
+        self._error = None
+        self._queue = queue.Queue(maxsize=queue_depth)
+        self._thread = threading.Thread(target=self._compress_blocks, daemon=True)
+        self._thread.start()
+
+    def _compress_blocks(self):
+        while True:
+            block = self._queue.get()
+            if block is None:
+                return
+            if self._error is None:
+                try:
+                    self._stream.write(block)
+                except Exception as e:
+                    self._error = e
+
+    def _check_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._check_error()
+        self._pending.append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= BLOCK_SIZE:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._pending:
+            self._queue.put(''.join(self._pending).encode())
+            self._pending = []
+            self._pending_size = 0
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.flush()
+            self._queue.put(None)
+            self._thread.join()
+            self._stream.close()
+        finally:
+            self._raw.close()
+            super().close()
+        self._check_error()
+
+
+@contextlib.contextmanager
+def _borrow_stream(stream):
+    """Adapts a caller's stream for text writing without closing it"""
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+        text = io.TextIOWrapper(stream, write_through=False)
+        try:
+            yield text
+        finally:
+            text.flush()
+            text.detach()
+    else:
+        try:
+            yield stream
+        finally:
+            stream.flush()
+
+
+def open_log_output(filename):
+    """Opens a log for text writing. Files ending in .gz, .zst or .xz are
+    compressed on a background thread while the caller writes.
+
+    Args:
+        filename (str|file): The location to save the file, '-' for stdout,
+            or a writable text or binary stream, which is left open
+
+    Returns:
+        io.TextIOBase: A writable text stream, to be used as a context manager
+    """
+    if filename == '-':
+        filename = sys.stdout
+    if hasattr(filename, 'write'):
+        return _borrow_stream(filename)
+    codec = _EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+    if codec is None:
+        return open(filename, 'w')
+    return CompressingWriter(filename, codec)
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+# Rows formatted per step, bounding the memory held by the column text
+CHUNK_ROWS = 1 << 16
+
+# Sorted lines joined into each write
+WRITE_LINES = 1 << 16
+
+
+def _column_text(values):
+    """Converts a column to a list of text, giving the same text as str() of each
+    value. Floats use Python's repr, which prints the shortest digits that round
+    trip and is quicker than numpy's float to text cast."""
+    kind = values.dtype.kind
+    if kind == 'f':
+        return list(map(repr, values.tolist()))
+    if kind in 'iub':
+        return list(map(str, values.tolist()))
+    if kind == 'U':
+        return values.tolist()
+    return list(map(str, values))
+
+
+def format_table(table, time_shift=0):
+    """Formats a table as dataflash text lines, "NAME, TimeUS, value, value, ...".
+    Each column is converted to text in one pass, then the columns are joined.
+
+    Args:
+        table (pd.DataFrame): The message name, timestamp and value columns
+        time_shift (int, optional): Microseconds added to the timestamps. Defaults to 0.
+
+    Returns:
+        (np.ndarray, list<str>): The timestamp of each line as uint64, and the lines
+    """
+    time_us = np.array([np.uint64(value) for value in table.iloc[:, 1]], dtype=np.uint64) \
+        if table.dtypes.iloc[1].kind == 'O' else table.iloc[:, 1].to_numpy().astype(np.uint64)
+    if time_shift != 0:
+        time_us += np.uint64(time_shift)
+    columns = [table.iloc[:, i].to_numpy() for i in range(2, table.shape[1])]
+    names = table.iloc[:, 0].to_numpy()
+    lines = []
+    for start in range(0, len(table), CHUNK_ROWS):
+        stop = start + CHUNK_ROWS
+        text = [_column_text(names[start:stop]), _column_text(time_us[start:stop])]
+        text.extend(_column_text(column[start:stop]) for column in columns)
+        if len(columns) == 0:
+            # messages with only a timestamp still end with a separator
+            text.append([''] * len(text[0]))
+        lines.extend(map(', '.join, zip(*text)))
+    return time_us, lines
+
+
+def _write_lines(outfile, lines):
+    for start in range(0, len(lines), WRITE_LINES):
+        outfile.write('\n'.join(lines[start:start + WRITE_LINES]) + '\n')
+
+
+def write_text_log(outfile, fmt_table, tables, preamble=(), executor=None, time_shifts=None):
+    """Writes a dataflash text log: the FMT messages, then the preamble tables,
+    then every other table with a TimeUS column, sorted on TimeUS
+
+    Args:
+        outfile (file): The text stream to write to
+        fmt_table (pd.DataFrame): The FMT messages, with the Type column
+        tables (dict<str, pd.DataFrame>): The tables to write
+        preamble (list<str>, optional): Tables written in full straight after the
+            FMT messages, rather than sorted in with the rest. Defaults to ().
+        executor (concurrent.futures.Executor, optional): Formats the tables in
+            parallel, one table per task. Defaults to None, formatting in turn.
+        time_shifts (dict<str, int>, optional): Microseconds added to the TimeUS of
+            tables, keyed on name, as in SharedTables. Defaults to None.
+    """
+    time_shifts = time_shifts or {}
+    np.savetxt(outfile, fmt_table.to_numpy(), fmt='%s', delimiter=',', newline='\n')
+    for name in preamble:
+        if name in tables and len(tables[name]) > 0:
+            _write_lines(outfile, format_table(tables[name])[1])
+
+    names = [name for name in tables
+             if name != 'FMT' and name not in preamble and 'TimeUS' in tables[name]]
+    mapper = executor.map if executor is not None else map
+    formatted = list(mapper(format_table, [tables[name] for name in names],
+                            [time_shifts.get(name, 0) for name in names]))
+    if len(formatted) == 0:
+        return
+
+    # sort the lines of every table together on their timestamps
+    time_us = np.concatenate([table_times for table_times, __ in formatted])
+    lines = np.empty(len(time_us), dtype=object)
+    position = 0
+    for __, table_lines in formatted:
+        lines[position:position + len(table_lines)] = table_lines
+        position += len(table_lines)
+    order = time_us.argsort()
+    for start in range(0, len(order), WRITE_LINES):
+        outfile.write('\n'.join(lines[order[start:start + WRITE_LINES]]) + '\n')
@@ -0,0 +1,142 @@
+import ast
+import operator
+import numpy as np
+
+
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+
+class RowFilter(object):
+    """A condition on the fields of one message type, such as
+    "Curr > 18", "Status >= 3 and TimeUS < 60e6" or "Message == 'Armed'".
+
+    Expressions may compare fields with numbers, strings or other fields, chain
+    comparisons, and combine them with and, or, not and parentheses. Values are
+    compared as stored in the log, before any scaling.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        try:
+            self._tree = ast.parse(expression, mode='eval').body
+        except SyntaxError as e:
+            raise ValueError(f'Invalid filter "{expression}": {e.msg}')
+        self.fields = set()
+        self._check(self._tree)
+
+    def _check(self, node):
+        if isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self._check(value)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            self._check(node.operand)
+        elif isinstance(node, ast.Compare):
+            for op in node.ops:
+                if type(op) not in _COMPARISONS:
+                    raise ValueError(f'Unsupported comparison in filter "{self.expression}"')
+            operands = [node.left] + node.comparators
+            for operand in operands:
+                if isinstance(operand, ast.Name):
+                    self.fields.add(operand.id)
+                elif self._constant(operand) is None:
+                    raise ValueError(f'Filter "{self.expression}" may only compare fields with numbers or strings')
+            if not any(isinstance(operand, ast.Name) for operand in operands):
+                raise ValueError(f'Comparison without a field in filter "{self.expression}"')
+        else:
+            raise ValueError(f'Unsupported expression in filter "{self.expression}"')
+
+    @staticmethod
+    def _constant(node):
+        """Returns the value of a number or string constant, or None for anything
+        else. Signed numbers such as -30 parse as a unary minus on the number."""
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = RowFilter._constant(node.operand)
+            if value is None or isinstance(value, str):
+                return None
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+            return node.value
+        return None
+
+    def _operand(self, node, columns):
+        if isinstance(node, ast.Name):
+            return columns[node.id]
+        return self._constant(node)
+
+    @staticmethod
+    def _coerce(values, other):
+        """Makes a column comparable with a constant: strings are encoded to
+        match binary string fields, and the text reader's string columns are
+        read as numbers"""
+        values = np.asarray(values)
+        if isinstance(other, str):
+            return values, other.encode('ascii') if values.dtype.kind == 'S' else other
+        if values.dtype.kind in 'OU':
+            values = values.astype(np.float64)
+        return values, other
+
+    @staticmethod
+    def _as_numbers(values):
+        """Reads a text log column as numbers, or returns None for a string field"""
+        try:
+            return values.astype(np.float64)
+        except (ValueError, TypeError):
+            return None
+
+    def _compare(self, op, left, right):
+        if isinstance(left, (int, float, str)):
+            right, left = self._coerce(right, left)
+        elif isinstance(right, (int, float, str)):
+            left, right = self._coerce(left, right)
+        else:
+            # the text reader keeps every field as a string, so compare two
+            # fields as numbers unless they both really are strings
+            left, right = np.asarray(left), np.asarray(right)
+            if left.dtype.kind in 'OU' or right.dtype.kind in 'OU':
+                numbers = [self._as_numbers(values) if values.dtype.kind in 'OU' else values
+                           for values in (left, right)]
+                if all(values is not None for values in numbers):
+                    left, right = numbers
+        return _COMPARISONS[type(op)](left, right)
+
+    def _evaluate(self, node, columns):
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            result = self._evaluate(node.values[0], columns)
+            for value in node.values[1:]:
+                result = combine(result, self._evaluate(value, columns))
+            return result
+        if isinstance(node, ast.UnaryOp):
+            return np.logical_not(self._evaluate(node.operand, columns))
+
+        # chained comparisons, a < b < c, hold when every pair holds
+        result = None
+        left = self._operand(node.left, columns)
+        for op, comparator in zip(node.ops, node.comparators):
+            right = self._operand(comparator, columns)
+            compared = self._compare(op, left, right)
+            result = compared if result is None else np.logical_and(result, compared)
+            left = right
+        return result
+
+    def mask(self, columns):
+        """Evaluates the filter
+
+        Args:
+            columns (mapping): Arrays of field values keyed on field name, such as
+                a numpy structured array or a dict of arrays
+
+        Returns:
+            np.ndarray: Boolean array, True for the rows to keep
+        """
+        return self._evaluate(self._tree, columns)
+
+    def __str__(self):
+        return self.expression
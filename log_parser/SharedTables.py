@@ -0,0 +1,70 @@
+from collections.abc import MutableMapping
+import numpy as np
+
+
+class SharedTables(MutableMapping):
+    """The tables of a log keyed on message name, where a table may carry a
+    TimeUS shift that has not been applied yet.
+
+    Merging with shared tables keeps references to the source logs' DataFrames
+    and only records how far each table's timestamps move. A shift is applied
+    the first time its table is looked up, and output_log applies them as it
+    writes, so the shifted tables are never built when merging straight to a
+    file. Every read goes through the lookup, so copies, dict(tables) and
+    {**tables} all see shifted timestamps.
+    """
+
+    def __init__(self, tables=None):
+        self._tables = dict(tables or {})
+        # name -> microseconds to add to TimeUS
+        self.time_shifts = {}
+
+    def shift(self, name, time_shift_us):
+        """Adds time_shift_us to the TimeUS of a table, without touching its data"""
+        self.time_shifts[name] = self.time_shifts.get(name, 0) + int(time_shift_us)
+
+    def __getitem__(self, name):
+        table = self._tables[name]
+        time_shift = self.time_shifts.pop(name, None)
+        if time_shift is not None:
+            # replace only the TimeUS column, sharing the others with the source
+            table = table.copy(deep=False)
+            position = table.columns.get_loc('TimeUS')
+            time_us = table.pop('TimeUS').astype(np.uint64) + np.uint64(time_shift)
+            table.insert(position, 'TimeUS', time_us)
+            self._tables[name] = table
+        return table
+
+    def __setitem__(self, name, table):
+        self.time_shifts.pop(name, None)
+        self._tables[name] = table
+
+    def __delitem__(self, name):
+        self.time_shifts.pop(name, None)
+        del self._tables[name]
+
+    def __contains__(self, name):
+        return name in self._tables
+
+    def __iter__(self):
+        return iter(self._tables)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def copy(self):
+        """Returns a shallow copy, keeping any shifts not yet applied"""
+        tables = SharedTables(self._tables)
+        tables.time_shifts = dict(self.time_shifts)
+        return tables
+
+    def unshifted(self):
+        """Returns the tables as stored, without applying any shifts
+
+        Returns:
+            dict<str, pd.DataFrame>: The tables, to be read with time_shifts
+        """
+        return dict(self._tables)
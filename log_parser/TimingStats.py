@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+import argparse
+import numpy as np
+import pandas as pd
+from log_parser.DFFramer import BinFramer, MessageFormat
+from log_parser.LogIO import open_log_input, read_stream
+
+
+STAT_COLUMNS = ['count', 'duration_s', 'mean_rate_hz', 'median_rate_hz', 'jitter_us',
+                'max_gap_us', 'max_gaps', 'out_of_order']
+
+# Number of largest gaps reported per table
+GAP_COUNT = 5
+
+# Log spaced histogram of message intervals used to find the median interval
+# when streaming: 1us to ~1000s, about 2% wide bins
+_HIST_BINS_PER_DECADE = 100
+_HIST_EDGES = np.logspace(0, 9, 9 * _HIST_BINS_PER_DECADE + 1)
+
+
+def _largest_gaps(time_us, intervals):
+    """Returns the (TimeUS, gap) of the largest intervals, largest first"""
+    count = min(GAP_COUNT, len(intervals))
+    if count == 0:
+        return []
+    largest = np.argpartition(intervals, -count)[-count:]
+    largest = largest[np.argsort(intervals[largest])[::-1]]
+    return [(int(time_us[i]), int(intervals[i])) for i in largest]
+
+
+def _summarise(count, first, last, median_interval, jitter, gaps, out_of_order):
+    duration = (last - first) / 1e6 if count > 0 else 0.0
+    return {
+        'count': count,
+        'duration_s': duration,
+        'mean_rate_hz': (count - 1) / duration if duration > 0 else np.nan,
+        'median_rate_hz': 1e6 / median_interval if median_interval > 0 else np.nan,
+        'jitter_us': jitter,
+        'max_gap_us': gaps[0][1] if len(gaps) > 0 else np.nan,
+        'max_gaps': gaps,
+        'out_of_order': out_of_order,
+    }
+
+
+def interval_stats(time_us):
+    """Computes the rate, jitter, gap and ordering statistics of one message type
+
+    Args:
+        time_us (np.ndarray): The TimeUS of every message, in log order
+
+    Returns:
+        dict: The statistics keyed on the names in STAT_COLUMNS
+    """
+    time_us = np.asarray(time_us, dtype=np.int64)
+    intervals = np.diff(time_us)
+    forward = intervals[intervals > 0]
+    return _summarise(len(time_us),
+                      time_us.min() if len(time_us) > 0 else 0,
+                      time_us.max() if len(time_us) > 0 else 0,
+                      np.median(forward) if len(forward) > 0 else 0,
+                      forward.std() if len(forward) > 0 else np.nan,
+                      _largest_gaps(time_us, intervals),
+                      int(np.count_nonzero(intervals < 0)))
+
+
+def _stats_frame(stats):
+    return pd.DataFrame.from_dict(stats, orient='index', columns=STAT_COLUMNS)
+
+
+class TimingAccumulator(object):
+    """Gathers the statistics of interval_stats from chunks of rows, keeping
+    only running totals, so they are available while streaming a log without
+    keeping its tables. The median interval comes from a histogram with
+    about 2% resolution.
+    """
+
+    class _Totals(object):
+        def __init__(self):
+            self.count = 0
+            self.first = None
+            self.last_time = None
+            self.max_time = None
+            self.forward = 0
+            self.total = 0.0
+            self.total_squares = 0.0
+            self.histogram = np.zeros(len(_HIST_EDGES) - 1, dtype=np.int64)
+            self.gaps = []
+            self.out_of_order = 0
+
+    def __init__(self):
+        self._totals = {}
+
+    def update(self, name, time_us):
+        """Adds the next rows of a table
+
+        Args:
+            name (str): The table name
+            time_us (np.ndarray): The TimeUS of the new rows, in log order
+        """
+        time_us = np.asarray(time_us, dtype=np.int64)
+        if len(time_us) == 0:
+            return
+        totals = self._totals.setdefault(name, TimingAccumulator._Totals())
+        if totals.last_time is not None:
+            # include the interval from the end of the previous chunk
+            time_us = np.concatenate(([totals.last_time], time_us))
+            totals.count -= 1
+        intervals = np.diff(time_us)
+        forward = intervals[intervals > 0].astype(np.float64)
+
+        totals.count += len(time_us)
+        chunk_min, chunk_max = time_us.min(), time_us.max()
+        totals.first = chunk_min if totals.first is None else min(totals.first, chunk_min)
+        totals.max_time = chunk_max if totals.max_time is None else max(totals.max_time, chunk_max)
+        totals.last_time = time_us[-1]
+        totals.forward += len(forward)
+        totals.total += forward.sum()
+        totals.total_squares += np.square(forward).sum()
+        totals.histogram += np.histogram(forward, bins=_HIST_EDGES)[0]
+        totals.gaps = sorted(totals.gaps + _largest_gaps(time_us, intervals),
+                             key=lambda gap: gap[1], reverse=True)[:GAP_COUNT]
+        totals.out_of_order += int(np.count_nonzero(intervals < 0))
+
+    def _median_interval(self, totals):
+        if totals.forward == 0:
+            return 0
+        bin_index = np.searchsorted(np.cumsum(totals.histogram), (totals.forward + 1) / 2)
+        bin_index = min(bin_index, len(totals.histogram) - 1)
+        return np.sqrt(_HIST_EDGES[bin_index] * _HIST_EDGES[bin_index + 1])
+
+    def stats(self):
+        """Returns the statistics gathered so far
+
+        Returns:
+            pd.DataFrame: One row of statistics per table, columns as STAT_COLUMNS
+        """
+        stats = {}
+        for name, totals in self._totals.items():
+            jitter = np.nan
+            if totals.forward > 0:
+                mean = totals.total / totals.forward
+                jitter = np.sqrt(max(totals.total_squares / totals.forward - mean * mean, 0.0))
+            stats[name] = _summarise(totals.count, totals.first, totals.max_time,
+                                     self._median_interval(totals), jitter,
+                                     totals.gaps, totals.out_of_order)
+        return _stats_frame(stats)
+
+
+def table_timing_stats(tables):
+    """Computes interval_stats for every table with a TimeUS column
+
+    Args:
+        tables (dict<str, pd.DataFrame>): Tables keyed on message name
+
+    Returns:
+        pd.DataFrame: One row of statistics per table, columns as STAT_COLUMNS
+    """
+    return _stats_frame({name: interval_stats(pd.to_numeric(table['TimeUS']).to_numpy())
+                         for name, table in tables.items() if 'TimeUS' in table.columns})
+
+
+def scan_timing_stats(filename):
+    """Computes the timing statistics of a binary log without building its
+    tables. Only the TimeUS field of each message is unpacked.
+
+    Args:
+        filename (str): The location of the (optionally compressed) binary log
+
+    Returns:
+        pd.DataFrame: One row of statistics per table, columns as STAT_COLUMNS
+    """
+    with open_log_input(filename) as infile:
+        buf = memoryview(read_stream(infile))
+    framer = BinFramer()
+    offsets, __ = framer.frame(buf)
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    stats = {}
+    for type_id, starts in offsets.items():
+        fmt = MessageFormat(*framer.formats[type_id])
+        if fmt.size == fmt.length - 2 and 'TimeUS' in fmt.columns:
+            stats[fmt.name] = interval_stats(fmt.unpack_field(raw, starts, 'TimeUS'))
+    return _stats_frame(stats)
+
+
+def timing_report(filenames):
+    """Gathers the timing statistics of many binary logs into one table
+
+    Args:
+        filenames (list<str>): The logs to report on
+
+    Returns:
+        pd.DataFrame: One row per log and table, with 'log' and 'table' columns
+    """
+    reports = []
+    for filename in filenames:
+        stats = scan_timing_stats(filename)
+        stats.insert(0, 'log', filename)
+        reports.append(stats.rename_axis('table').reset_index())
+    if len(reports) == 0:
+        return pd.DataFrame(columns=['table', 'log'] + STAT_COLUMNS)
+    return pd.concat(reports, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output", help="The csv file to write the report to")
+    parser.add_argument("files", help="Binary logs to report on", nargs="+")
+    args = parser.parse_args()
+    timing_report(args.files).to_csv(args.output, index=False)
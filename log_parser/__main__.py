@@ -1,10 +1,12 @@
 import os
 import sys
-from kivy.resources import resource_add_path
-from log_parser.log_parse_gui import Editor
 
 
 def main():
+    # Kivy is only imported when the GUI is started
+    from kivy.resources import resource_add_path
+    from log_parser.log_parse_gui import Editor
+
     if hasattr(sys, '_MEIPASS'):
         resource_add_path(os.path.join(sys._MEIPASS))
 
@@ -12,4 +14,9 @@ def main():
     app.run()
 
 if __name__ == '__main__':
-    main()
+    # with arguments, run the command line tool instead of the GUI
+    if len(sys.argv) > 1:
+        from log_parser.cli import main as cli_main
+        cli_main()
+    else:
+        main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Command line entry point, installed as `dflogtool`.
+
+Subcommands import what they need when they run, so inspecting a log does
+not pay for importing pandas, and nothing imports the GUI.
+"""
+
+import argparse
+import contextlib
+import sys
+
+
+def add_merge_arguments(parser):
+    parser.add_argument("output", help="The new log file to output into, - for stdout")
+    parser.add_argument("base", help="The primary file to merge into, - for stdin")
+    parser.add_argument("-f", "--files", help="Paths of files to merge", nargs="+")
+    parser.add_argument('-d', '--drop', help='The names of fields to drop from incoming files', nargs='*')
+    parser.add_argument('-t', '--time_shift', help='Number of milliseconds to shift incoming files by', type=int, default=0)
+    parser.add_argument('-a', '--auto_shift', help='The name of a file to merge with automatic time shifting')
+
+
+@contextlib.contextmanager
+def _divert_progress(args):
+    """Sends progress messages to stderr while a command writes its output to stdout"""
+    if getattr(args, 'output', None) != '-':
+        yield
+        return
+    args.output = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        yield
+
+
+def merge(args):
+    from log_parser.DFParser import DFLog
+
+    log = DFLog(args.base)
+    ts = args.time_shift
+    if args.auto_shift is not None:
+        ips_log = DFLog(args.auto_shift)
+        ts += log.find_offset(ips_log)
+        log.merge(ips_log, drop_tables=args.drop,
+                  time_shift=ts, gps_time_shift=False, share_tables=True)
+    if args.files is not None:
+        for f in args.files:
+            log.merge(DFLog(f), drop_tables=args.drop, time_shift=ts, gps_time_shift=True,
+                      share_tables=True)
+    log.output_log(args.output)
+
+
+def inspect(args):
+    from log_parser.LogCatalog import scan_log
+
+    for filename in args.files:
+        summary = scan_log(filename)
+        print(filename)
+        if summary.first_time_us is not None:
+            print(f'  TimeUS: {summary.first_time_us} - {summary.last_time_us} '
+                  f'({(summary.last_time_us - summary.first_time_us) / 1e6:.1f} s)')
+        if summary.gps_zero_time is not None:
+            print(f'  GPS zero time: {summary.gps_zero_time}')
+        for __, text in summary.msg_text:
+            print(f'  MSG: {text}')
+        for type_id, name, length, fmt, columns in summary.formats:
+            count = summary.messages.get(name, [0])[0]
+            print(f'  {type_id:>4} {name:<5} {count:>10}  {fmt:<16} {columns}')
+
+
+def _parse_filters(where):
+    filters = {}
+    for condition in where or []:
+        table, sep, expression = condition.partition(':')
+        if not sep:
+            raise SystemExit(f'Filter "{condition}" should look like TABLE:EXPRESSION')
+        if table in filters:
+            expression = f'({filters[table]}) and ({expression})'
+        filters[table] = expression
+    return filters
+
+
+def _split(value):
+    if value == 'flights':
+        return value
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected "flights" or a number of seconds, not "{value}"')
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f'the window length must be positive, not {value}')
+    return seconds
+
+
+def export(args):
+    from log_parser.DFParser import DFLog
+
+    log = DFLog(args.input, filters=_parse_filters(args.where), time_range=args.time_range)
+    written = log.output_log(args.output, split=args.split, workers=args.workers)
+    if written is not None:
+        print('\n'.join(written))
+
+
+def stats(args):
+    from log_parser.TimingStats import timing_report
+
+    timing_report(args.files).to_csv(args.output, index=False)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='dflogtool', description='Dataflash log merge and inspection tool')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    merge_parser = subparsers.add_parser('merge', help='Merge logs into one time sorted text log')
+    add_merge_arguments(merge_parser)
+    merge_parser.set_defaults(run=merge)
+
+    inspect_parser = subparsers.add_parser('inspect', help='List the formats, message counts and time range of binary logs')
+    inspect_parser.add_argument("files", help="Binary logs to inspect", nargs="+")
+    inspect_parser.set_defaults(run=inspect)
+
+    export_parser = subparsers.add_parser('export', help='Convert a log to a text log')
+    export_parser.add_argument("input", help="The log to convert, - for stdin")
+    export_parser.add_argument("output", help="The text log to write, - for stdout")
+    export_parser.add_argument("-w", "--where", action='append',
+                               help="Only keep rows of a table meeting a condition, e.g. 'BAT:Curr > 18'. May be repeated")
+    export_parser.add_argument("-r", "--time_range", type=int, nargs=2, metavar=('START', 'END'),
+                               help="Only keep data rows with START <= TimeUS < END")
+    export_parser.add_argument("-s", "--split", metavar='flights|SECONDS', type=_split,
+                               help="Write one log per flight, or per window of SECONDS, numbered from the output name")
+    export_parser.add_argument("-j", "--workers", type=int, help="Processes writing split logs, defaults to one per CPU")
+    export_parser.set_defaults(run=export)
+
+    stats_parser = subparsers.add_parser('stats', help='Write message rate, gap and ordering statistics as csv')
+    stats_parser.add_argument("files", help="Binary logs to report on", nargs="+")
+    stats_parser.add_argument("-o", "--output", help="The csv file to write, defaults to stdout", default='-')
+    stats_parser.set_defaults(run=stats)
+    return parser
+
+
+def merge_main(argv=None):
+    """Runs the merge command with the argument surface of DFParser.py"""
+    parser = argparse.ArgumentParser()
+    add_merge_arguments(parser)
+    args = parser.parse_args(argv)
+    with _divert_progress(args):
+        merge(args)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with _divert_progress(args):
+        args.run(args)
+
+
+if __name__ == "__main__":
+    main()
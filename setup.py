@@ -8,4 +8,7 @@ setup(name='log_parser',
       description='Python DF Log Merge and Parsing Tool',
       author='William Hampton',
       packages=find_packages(),
+      entry_points={
+          'console_scripts': ['dflogtool=log_parser.cli:main'],
+      },
      )
\ No newline at end of file